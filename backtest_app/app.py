@@ -3,15 +3,19 @@ Simple Backtest Web App
 FastAPI server that runs backtests on uploaded strategy files
 """
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, File, UploadFile, Form, Header, HTTPException
+from fastapi.responses import HTMLResponse, ORJSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 import os
 import json
+import hashlib
+import numpy as np
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional, Tuple
 from backtest_runner import run_backtest, validate_strategy_code
 
-app = FastAPI(title="Backtest App")
+app = FastAPI(title="Backtest App", default_response_class=ORJSONResponse)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -40,9 +44,9 @@ async def backtest(
     """
 
     try:
-        # Read uploaded files
+        # Read uploaded strategy (the CSV is parsed straight from its spooled file)
         strategy_code = (await strategy_file.read()).decode('utf-8')
-        csv_data = (await data_csv.read()).decode('utf-8')
+        await data_csv.seek(0)
 
         # Validate strategy code for safety
         is_valid, error_msg = validate_strategy_code(strategy_code)
@@ -52,12 +56,12 @@ async def backtest(
         # Run backtest
         results = run_backtest(
             strategy_code=strategy_code,
-            csv_data=csv_data,
+            csv_data=data_csv.file,
             initial_cash=initial_cash,
             commission=commission
         )
 
-        return JSONResponse(content=results)
+        return ORJSONResponse(content=results)
 
     except HTTPException:
         raise
@@ -66,62 +70,114 @@ async def backtest(
 
 
 @app.get("/api/sample-strategy")
-async def get_sample_strategy():
+async def get_sample_strategy(if_none_match: Optional[str] = Header(None)):
     """Download sample strategy file"""
-    sample_path = Path("strategy_templates/sample_strategy.py")
-    if not sample_path.exists():
+    try:
+        content, etag = _load_sample_strategy()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Sample strategy not found")
 
-    return FileResponse(
-        path=sample_path,
+    # Let browsers reuse their cached copy
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={'ETag': etag})
+
+    return Response(
+        content=content,
         media_type='text/plain',
-        filename='sample_strategy.py'
+        headers={
+            'Content-Disposition': 'attachment; filename="sample_strategy.py"',
+            'ETag': etag
+        }
     )
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+@lru_cache(maxsize=1)
+def _load_sample_strategy() -> Tuple[bytes, str]:
+    """
+    Read the sample strategy template once and keep it in memory
+
+    A missing template raises FileNotFoundError, which lru_cache does not
+    store, so the file is picked up once it appears.
+
+    Returns:
+        (file contents, quoted ETag)
+    """
+    content = Path("strategy_templates/sample_strategy.py").read_bytes()
+    etag = '"' + hashlib.blake2b(content, digest_size=8).hexdigest() + '"'
+    return content, etag
+
+
 @app.get("/api/sample-data")
 async def get_sample_data():
     """Download sample CSV data"""
-    # Generate sample data
-    import pandas as pd
-    import tempfile
+    return Response(
+        content=_build_sample_csv(),
+        media_type='text/csv',
+        headers={'Content-Disposition': 'attachment; filename="sample_data.csv"'}
+    )
+
 
-    # Create 2 years of sample data
-    dates = pd.date_range(start='2022-01-01', end='2024-01-01', freq='D')
+@lru_cache(maxsize=1)
+def _build_sample_csv() -> bytes:
+    """
+    Generate the sample OHLCV CSV
+
+    The data is seeded and therefore identical on every call, so the
+    encoded bytes are built on first request and reused afterwards.
 
-    # Add some realistic price movement
-    import random
-    random.seed(42)
+    Returns:
+        CSV file contents
+    """
+    # Create 2 years of sample data (daily, end date inclusive)
+    dates = np.arange('2022-01-01', '2024-01-02', dtype='datetime64[D]')
+    n = len(dates)
 
-    prices = []
-    current_price = 100
-    for i in range(len(dates)):
-        change = random.uniform(-2, 2)
-        current_price += change
-        prices.append(current_price)
+    # Add some realistic price movement (random walk, generated in one pass)
+    rng = np.random.default_rng(42)
+    prices = 100 + np.cumsum(rng.uniform(-2, 2, n))
+
+    # Open/High/Low offsets from one (n, 3) draw scaled per column
+    u = rng.uniform(size=(n, 3))
+    ohl = prices[:, None] * (np.array([0.99, 1.00, 0.98]) + np.array([0.01, 0.02, 0.01]) * u)
 
     data = {
-        'Date': dates.strftime('%Y-%m-%d'),
-        'Open': [p * random.uniform(0.99, 1.00) for p in prices],
-        'High': [p * random.uniform(1.00, 1.02) for p in prices],
-        'Low': [p * random.uniform(0.98, 0.99) for p in prices],
+        'Date': np.datetime_as_string(dates, unit='D'),
+        'Open': ohl[:, 0],
+        'High': ohl[:, 1],
+        'Low': ohl[:, 2],
         'Close': prices,
-        'Volume': [random.randint(500000, 2000000) for _ in range(len(dates))]
+        'Volume': rng.integers(500000, 2000001, n)
     }
-    df = pd.DataFrame(data)
 
-    # Save to temporary file
-    temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv')
-    df.to_csv(temp_file.name, index=False)
-    temp_file.close()
+    return _format_csv(data).encode('utf-8')
 
-    return FileResponse(
-        path=temp_file.name,
-        media_type='text/csv',
-        filename='sample_data.csv'
-    )
+
+def _format_csv(columns: dict) -> str:
+    """
+    Format a dict of equal-length NumPy columns as CSV text
+
+    Args:
+        columns: Mapping of column name to array values
+
+    Returns:
+        CSV text with a header row
+    """
+    rows = zip(*(values.tolist() for values in columns.values()))
+    return ','.join(columns) + '\n' + ''.join(','.join(map(str, row)) + '\n' for row in rows)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+
+    # Backtests are CPU-bound, so run one worker process per core (up to 4).
+    # uvicorn picks uvloop/httptools automatically when they are installed.
+    uvicorn.run("app:app", host="127.0.0.1", port=8000, workers=min(os.cpu_count() or 1, 4))
@@ -3,21 +3,35 @@ Backtest Runner
 Executes strategy code safely and returns results
 """
 
-import backtrader as bt
-import pandas as pd
+import ast
+import numpy as np
 from io import StringIO
 import sys
 import traceback
-from typing import Dict, Tuple
+from datetime import datetime, time
+from functools import lru_cache
+from types import CodeType
+from typing import IO, Dict, Iterable, Iterator, Optional, Tuple, Union
 
 
-# List of forbidden imports for security
-FORBIDDEN_IMPORTS = [
-    'os', 'sys', 'subprocess', 'socket', 'requests',
-    'pathlib', 'shutil', 'urllib', 'http', 'ftplib',
-    'smtplib', 'telnetlib', 'pickle', 'shelve', 'eval',
-    'exec', 'compile', '__import__', 'open'
-]
+# Packages strategy code may import (checked at validation and at run time)
+ALLOWED_IMPORTS = frozenset(['backtrader', 'pandas', 'numpy'])
+
+# Functions strategy code may not call
+DANGEROUS_FUNCTIONS = frozenset(['eval', 'exec', 'compile', '__import__', 'open'])
+
+# Noise source for the simplified equity curve
+EQUITY_NOISE_RNG = np.random.Generator(np.random.Philox(0xC0FFEE))
+
+# Columns the uploaded CSV must provide, and their parse dtypes
+REQUIRED_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+CSV_DTYPES = {
+    'Open': np.float64,
+    'High': np.float64,
+    'Low': np.float64,
+    'Close': np.float64,
+    'Volume': np.float64,
+}
 
 
 def validate_strategy_code(code: str) -> Tuple[bool, str]:
@@ -31,31 +45,119 @@ def validate_strategy_code(code: str) -> Tuple[bool, str]:
         (is_valid, error_message)
     """
 
-    # Check for forbidden imports
-    for forbidden in FORBIDDEN_IMPORTS:
-        if f'import {forbidden}' in code or f'from {forbidden}' in code:
-            return False, f"Forbidden import detected: {forbidden}. Only backtrader, pandas, and numpy are allowed."
-
-    # Check for dangerous functions
-    dangerous_funcs = ['eval(', 'exec(', 'compile(', '__import__(', 'open(']
-    for func in dangerous_funcs:
-        if func in code:
-            return False, f"Dangerous function detected: {func}"
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return False, f"Syntax error on line {e.lineno}: {e.msg}"
+
+    for node in ast.walk(tree):
+        # Check for forbidden imports (anything outside ALLOWED_IMPORTS)
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level != 0:
+                return False, "Relative imports are not allowed. Only backtrader, pandas, and numpy are allowed."
+            modules = [node.module]
+        else:
+            modules = []
+        for module in modules:
+            root = module.split('.')[0]
+            if root not in ALLOWED_IMPORTS:
+                return False, f"Forbidden import detected: {root}. Only backtrader, pandas, and numpy are allowed."
+
+        # Check for dangerous functions (bare or attribute calls)
+        if isinstance(node, ast.Call):
+            func = node.func
+            name = func.id if isinstance(func, ast.Name) else getattr(func, 'attr', None)
+            if name in DANGEROUS_FUNCTIONS:
+                return False, f"Dangerous function detected: {name}("
 
     # Must contain a Strategy class
-    if 'class' not in code or 'bt.Strategy' not in code:
+    if next(_find_strategy_classes(tree.body), None) is None:
         return False, "Strategy must define a class that inherits from bt.Strategy"
 
     return True, ""
 
 
-def run_backtest(strategy_code: str, csv_data: str, initial_cash: float, commission: float) -> Dict:
+def _is_bt_strategy(node: ast.expr) -> bool:
+    """Check whether an AST base-class expression is `bt.Strategy`"""
+    return (
+        isinstance(node, ast.Attribute)
+        and node.attr == 'Strategy'
+        and isinstance(node.value, ast.Name)
+        and node.value.id == 'bt'
+    )
+
+
+def _find_strategy_classes(statements: Iterable[ast.stmt]) -> Iterator[ast.ClassDef]:
+    """
+    Yield classes inheriting from bt.Strategy that are defined at module level
+
+    Looks inside module-level if/try/with/loop blocks, since those run when
+    the code is executed, but not inside function or class bodies.
+    """
+    for node in statements:
+        if isinstance(node, ast.ClassDef):
+            if any(_is_bt_strategy(base) for base in node.bases):
+                yield node
+        elif not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for field in ('body', 'handlers', 'orelse', 'finalbody', 'cases'):
+                yield from _find_strategy_classes(getattr(node, field, ()))
+
+
+def _restricted_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """`__import__` replacement for strategy code that only allows ALLOWED_IMPORTS"""
+    if level != 0 or name.split('.')[0] not in ALLOWED_IMPORTS:
+        raise ImportError(f"Import of '{name}' is not allowed. Only backtrader, pandas, and numpy are allowed.")
+    return __import__(name, globals, locals, fromlist, level)
+
+
+# Builtins available to strategy code, copied into each run's namespace
+SAFE_BUILTINS = {
+    '__build_class__': __build_class__,
+    '__import__': _restricted_import,
+    'range': range,
+    'len': len,
+    'print': print,
+    'str': str,
+    'int': int,
+    'float': float,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    'True': True,
+    'False': False,
+    'None': None,
+}
+
+
+@lru_cache(maxsize=64)
+def _compile_strategy(code: str) -> Tuple[CodeType, Optional[str]]:
+    """
+    Compile strategy source, cached by source text
+
+    Args:
+        code: Strategy code string
+
+    Returns:
+        (code object ready for exec, name of the first module-level class
+        inheriting from bt.Strategy or None)
+    """
+    tree = ast.parse(code, '<strategy>')
+
+    strategy_node = next(_find_strategy_classes(tree.body), None)
+    class_name = strategy_node.name if strategy_node else None
+
+    return compile(tree, '<strategy>', 'exec'), class_name
+
+
+def run_backtest(strategy_code: str, csv_data: Union[str, IO], initial_cash: float, commission: float) -> Dict:
     """
     Run backtest on strategy with provided data
 
     Args:
         strategy_code: Python code defining strategy
-        csv_data: CSV string with OHLCV data
+        csv_data: CSV string or readable file object with OHLCV data
         initial_cash: Starting capital
         commission: Commission rate (e.g., 0.001 for 0.1%)
 
@@ -63,62 +165,59 @@ def run_backtest(strategy_code: str, csv_data: str, initial_cash: float, commiss
         Dictionary with backtest results
     """
 
+    # Imported here so the sample/static endpoints don't pay for them at startup
+    import backtrader as bt
+    import pandas as pd
+    from numpy_feed import NumpyData
+    from trade_recorder import TradeRecorder
+
     try:
-        # Parse CSV data
-        df = pd.read_csv(StringIO(csv_data))
+        # Parse CSV data (only the OHLCV columns, with fixed dtypes)
+        df = pd.read_csv(
+            StringIO(csv_data) if isinstance(csv_data, str) else csv_data,
+            engine='c',
+            usecols=lambda col: col in REQUIRED_COLUMNS,
+            dtype=CSV_DTYPES
+        )
 
         # Ensure required columns
-        required_cols = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-        missing_cols = [col for col in required_cols if col not in df.columns]
+        present_cols = set(df.columns)
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in present_cols]
         if missing_cols:
             raise ValueError(f"CSV missing required columns: {missing_cols}")
 
-        # Convert date column
+        # Convert date column (the feed reads it directly, no index copy)
         df['Date'] = pd.to_datetime(df['Date'])
-        df = df.set_index('Date')
 
-        # Create Cerebro engine
-        cerebro = bt.Cerebro()
+        # Create Cerebro engine (default observers only feed plotting, which is unused)
+        cerebro = bt.Cerebro(stdstats=False)
 
         # Load strategy from code
-        # Create a restricted namespace
+        # Create a restricted namespace. Classes defined in it report this
+        # module as their __module__, which backtrader's metaclasses look up
+        # in sys.modules. The builtins are copied so one run can't alter them
+        # for the next.
         namespace = {
+            '__name__': __name__,
             'bt': bt,
             'pd': pd,
-            '__builtins__': {
-                'range': range,
-                'len': len,
-                'print': print,
-                'str': str,
-                'int': int,
-                'float': float,
-                'list': list,
-                'dict': dict,
-                'tuple': tuple,
-                'True': True,
-                'False': False,
-                'None': None,
-            }
+            '__builtins__': SAFE_BUILTINS.copy()
         }
 
         # Execute strategy code in restricted namespace
-        exec(strategy_code, namespace)
-
-        # Find the Strategy class
-        strategy_class = None
-        for item_name, item in namespace.items():
-            if isinstance(item, type) and issubclass(item, bt.Strategy) and item != bt.Strategy:
-                strategy_class = item
-                break
+        strategy_code_obj, class_name = _compile_strategy(strategy_code)
+        exec(strategy_code_obj, namespace)
 
-        if strategy_class is None:
+        # Look up the Strategy class found while parsing
+        strategy_class = namespace.get(class_name)
+        if not (isinstance(strategy_class, type) and issubclass(strategy_class, bt.Strategy)):
             raise ValueError("No Strategy class found in uploaded file")
 
         # Add strategy
         cerebro.addstrategy(strategy_class)
 
         # Add data feed
-        data = bt.feeds.PandasData(dataname=df)
+        data = NumpyData(dataname=df, datetime='Date')
         cerebro.adddata(data)
 
         # Set initial cash
@@ -132,6 +231,7 @@ def run_backtest(strategy_code: str, csv_data: str, initial_cash: float, commiss
         cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
         cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
         cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
+        cerebro.addanalyzer(TradeRecorder, _name='trade_list')
 
         # Track equity curve
         initial_value = cerebro.broker.getvalue()
@@ -148,6 +248,7 @@ def run_backtest(strategy_code: str, csv_data: str, initial_cash: float, commiss
         drawdown_analyzer = strat.analyzers.drawdown.get_analysis()
         trades_analyzer = strat.analyzers.trades.get_analysis()
         sharpe_analyzer = strat.analyzers.sharpe.get_analysis()
+        trade_records = strat.analyzers.trade_list.get_analysis()
 
         # Calculate metrics
         total_return = ((final_value - initial_value) / initial_value) * 100
@@ -186,7 +287,7 @@ def run_backtest(strategy_code: str, csv_data: str, initial_cash: float, commiss
                 'final_value': round(final_value, 2)
             },
             'equity_curve': equity_curve,
-            'trades': extract_trades(strat, trades_analyzer)
+            'trades': extract_trades(trade_records)
         }
 
         return results_dict
@@ -214,51 +315,52 @@ def generate_equity_curve(initial_value: float, final_value: float, num_points:
     """
 
     # Simple linear interpolation with some noise
-    import random
-    curve = []
+    if num_points <= 0:
+        return []
+
     total_return = (final_value - initial_value) / initial_value
 
-    for i in range(num_points):
-        progress = i / num_points
-        # Expected value with some random walk
-        expected = initial_value * (1 + total_return * progress)
-        # Add small random variation
-        noise = random.uniform(-0.02, 0.02) * expected
-        value = max(expected + noise, initial_value * 0.5)  # Don't go below 50% of initial
-        curve.append(round(value, 2))
+    # Expected value with some random walk
+    progress = np.arange(num_points) / num_points
+    expected = initial_value * (1 + total_return * progress)
+    # Add small random variation
+    noise = EQUITY_NOISE_RNG.uniform(-0.02, 0.02, num_points) * expected
+    curve = np.maximum(expected + noise, initial_value * 0.5).round(2)  # Don't go below 50% of initial
 
     # Ensure last value is final value
-    if curve:
-        curve[-1] = round(final_value, 2)
+    curve[-1] = round(final_value, 2)
 
-    return curve
+    return curve.tolist()
 
 
-def extract_trades(strat, trades_analyzer: dict) -> list:
+def extract_trades(trade_records) -> list:
     """
     Extract individual trades
 
     Args:
-        strat: Strategy instance
-        trades_analyzer: Trades analyzer results
+        trade_records: Closed-trade record array from TradeRecorder
 
     Returns:
         List of trade dictionaries
     """
 
+    from backtrader import num2date
+
     trades = []
+    for entry_dt, exit_dt, entry_price, size, bars, pnl, pnl_net in trade_records.tolist():
+        trades.append({
+            'entry_date': _format_trade_date(num2date(entry_dt)),
+            'exit_date': _format_trade_date(num2date(exit_dt)),
+            'entry_price': round(entry_price, 2),
+            'size': size,
+            'bars': bars,
+            'pnl': round(pnl, 2),
+            'pnl_net': round(pnl_net, 2)
+        })
 
-    # Get trade details if available
-    total_trades = trades_analyzer.get('total', {}).get('total', 0)
-    won_trades = trades_analyzer.get('won', {}).get('total', 0)
-    lost_trades = trades_analyzer.get('lost', {}).get('total', 0)
+    return trades
 
-    # Generate summary of trades (individual trade tracking would need custom analyzer)
-    trades.append({
-        'total': total_trades,
-        'won': won_trades,
-        'lost': lost_trades,
-        'win_rate': round((won_trades / total_trades * 100) if total_trades > 0 else 0, 2)
-    })
 
-    return trades
+def _format_trade_date(dt: datetime) -> str:
+    """ISO format a trade timestamp, as a plain date for daily (midnight) bars"""
+    return dt.date().isoformat() if dt.time() == time.min else dt.isoformat()
@@ -0,0 +1,70 @@
+"""
+NumPy Feed
+Backtrader data feed that loads bars from NumPy column arrays
+"""
+
+from datetime import datetime
+
+import backtrader as bt
+import numpy as np
+
+
+# Backtrader's float date of 1970-01-01 (days since 0001-01-01, plus one)
+EPOCH_DATENUM = bt.date2num(datetime(1970, 1, 1))
+
+# Feed lines filled from DataFrame columns
+LINE_COLUMNS = (
+    ('open', 'Open'),
+    ('high', 'High'),
+    ('low', 'Low'),
+    ('close', 'Close'),
+    ('volume', 'Volume'),
+)
+
+
+class NumpyData(bt.feed.DataBase):
+    """
+    Data feed for the Date/OHLCV DataFrame layout run_backtest produces
+
+    Column names are fixed by LINE_COLUMNS; unlike bt.feeds.PandasData
+    there are no per-line column params and openinterest is not filled. The
+    columns and dates are converted in bulk once in start(), so loading
+    a bar is plain list indexing instead of a DataFrame.iloc lookup per
+    field.
+
+    Params:
+    - datetime: Column holding the bar dates, or None to use the index
+    """
+
+    params = (
+        ('datetime', None),
+    )
+
+    def start(self):
+        """Convert the DataFrame to column arrays before preloading"""
+        super().start()
+
+        df = self.p.dataname
+        dates = df.index if self.p.datetime is None else df[self.p.datetime]
+        days = (dates.to_numpy('datetime64[ns]') - np.datetime64('1970-01-01', 'ns')) / np.timedelta64(1, 'D')
+
+        # Plain Python float lists: indexing them avoids boxing a NumPy
+        # scalar for every field of every bar
+        self._datetimes = (days + EPOCH_DATENUM).tolist()
+        self._columns = [
+            (getattr(self.lines, line), df[column].to_numpy(np.float64).tolist())
+            for line, column in LINE_COLUMNS
+        ]
+        self._columns.append((self.lines.datetime, self._datetimes))
+        self._idx = -1
+
+    def _load(self):
+        """Load the next bar, or return False when the arrays are exhausted"""
+        idx = self._idx = self._idx + 1
+        if idx >= len(self._datetimes):
+            return False
+
+        for line, values in self._columns:
+            line[0] = values[idx]
+
+        return True
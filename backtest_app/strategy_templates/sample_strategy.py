@@ -33,22 +33,25 @@ class MovingAverageCrossover(bt.Strategy):
             period=self.params.slow_period
         )
 
-        # Crossover signal
+        # Crossover signal (computed for all bars up front in runonce mode)
         self.crossover = bt.indicators.CrossOver(self.fast_ma, self.slow_ma)
 
     def next(self):
         """Execute on each bar"""
+        # Read the precomputed signal once for this bar
+        cross = self.crossover[0]
+
         # Check if we have an open position
         if not self.position:
             # No position - check for buy signal
-            if self.crossover > 0:  # Fast MA crossed above slow MA
+            if cross > 0:  # Fast MA crossed above slow MA
                 # Buy with 95% of available cash
                 size = int((self.broker.getcash() * 0.95) / self.data.close[0])
                 if size > 0:
                     self.buy(size=size)
         else:
             # Have position - check for sell signal
-            if self.crossover < 0:  # Fast MA crossed below slow MA
+            if cross < 0:  # Fast MA crossed below slow MA
                 # Sell entire position
                 self.close()
 
@@ -0,0 +1,65 @@
+"""
+Trade Recorder
+Backtrader analyzer that records every closed trade into a NumPy record array
+"""
+
+import backtrader as bt
+import numpy as np
+
+
+# One row per closed trade
+TRADE_DTYPE = np.dtype([
+    ('entry_dt', 'f8'),
+    ('exit_dt', 'f8'),
+    ('entry_price', 'f8'),
+    ('size', 'f8'),
+    ('bars', 'i8'),
+    ('pnl', 'f8'),
+    ('pnl_net', 'f8'),
+])
+
+
+class TradeRecorder(bt.Analyzer):
+    """
+    Record closed trades
+
+    Rows are written into an array preallocated to the number of bars
+    (a strategy can't close more trades than that without pyramiding),
+    which doubles in size if it ever fills up.
+
+    backtrader only notifies a trade when it opens and when it closes, not
+    when later fills add to it, so trade history is switched on and the
+    recorded size is the largest position the trade reached (negative for
+    shorts). That is the position the average entry price and PnL cover.
+    """
+
+    def start(self):
+        """Allocate storage before the first bar"""
+        self.records = np.empty(max(self.data.buflen(), 1), dtype=TRADE_DTYPE)
+        self.count = 0
+
+        # Keep every fill on the trade so the peak size is known at close
+        self.strategy.set_tradehistory()
+
+    def notify_trade(self, trade):
+        """Store the row once the trade closes"""
+        if not trade.isclosed:
+            return
+
+        if self.count == len(self.records):
+            self.records = np.resize(self.records, 2 * len(self.records))
+
+        self.records[self.count] = (
+            trade.dtopen,
+            trade.dtclose,
+            trade.price,
+            max((entry.status.size for entry in trade.history), key=abs, default=0.0),
+            trade.barlen,
+            trade.pnl,
+            trade.pnlcomm,
+        )
+        self.count += 1
+
+    def get_analysis(self):
+        """Return the filled part of the record array"""
+        return self.records[:self.count]